@@ -1,57 +1,58 @@
 # client.py
 import asyncio
+import logging
+import os
 import sys
 import time
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from contextlib import AsyncExitStack
-from dataclasses import dataclass
 from datetime import datetime
 
 # to interact with MCP
 from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from mcp.client.stdio import stdio_client, get_default_environment
 
 # to interact with Amazon Bedrock
 import boto3
+from botocore.config import Config
+
+import orjson
+
+# MCP_TIMING=1 일 때만 실행 시간 측정 결과를 출력
+TIMING = os.getenv("MCP_TIMING") == "1"
+logger = logging.getLogger(__name__)
+
+# tool_use 외의 종료 사유별 안내 문구 (end_turn은 응답 텍스트가 이미 전달되므로 없음)
+_STOP_MESSAGES = {
+    "end_turn": None,
+    "max_tokens": "[Max tokens reached, ending conversation.]",
+    "stop_sequence": "[Stop sequence reached, ending conversation.]",
+    "content_filtered": "[Content filtered, ending conversation.]",
+}
 
 # client.py
-@dataclass
+# Bedrock 메시지를 바로 dict로 생성 (대화 전체가 매 요청마다 전송되므로 중간 객체 생성을 피함)
 class Message:
-    role: str
-    content: List[Dict[str, Any]]
-
-    @classmethod
-    def user(cls, text: str) -> 'Message':
-        return cls(role="user", content=[{"text": text}])
-
-    @classmethod
-    def assistant(cls, text: str) -> 'Message':
-        return cls(role="assistant", content=[{"text": text}])
-
-    @classmethod
-    def tool_result(cls, tool_use_id: str, content: dict) -> 'Message':
-        return cls(
-            role="user",
-            content=[{
+    @staticmethod
+    def user(text: str) -> Dict[str, Any]:
+        return {"role": "user", "content": [{"text": text}]}
+
+    @staticmethod
+    def assistant(text: str) -> Dict[str, Any]:
+        return {"role": "assistant", "content": [{"text": text}]}
+
+    # 한 턴의 도구 결과는 모두 하나의 user 메시지에 담음 ((toolUseId, MCP 결과 content) 목록)
+    @staticmethod
+    def tool_results(results: List[tuple]) -> Dict[str, Any]:
+        return {
+            "role": "user",
+            "content": [{
                 "toolResult": {
                     "toolUseId": tool_use_id,
                     "content": [{"json": {"text": content[0].text}}]
                 }
-            }]
-        )
-
-    @classmethod
-    def tool_request(cls, tool_use_id: str, name: str, input_data: dict) -> 'Message':
-        return cls(
-            role="assistant",
-            content=[{
-                "toolUse": {
-                    "toolUseId": tool_use_id,
-                    "name": name,
-                    "input": input_data
-                }
-            }]
-        )
+            } for tool_use_id, content in results]
+        }
 
     @staticmethod
     def to_bedrock_format(tools_list: List[Dict]) -> List[Dict]:
@@ -74,22 +75,49 @@ class Message:
 class MCPClient:
     MODEL_ID = "anthropic.claude-3-5-sonnet-20241022-v2:0"
     # MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+    # 지연 시간 최적화 추론(LATENCY_MODE = "optimized")은 일부 모델만 us-east-2 리전에서 지원
+    # 사용하려면 아래 inference profile로 바꾸고 bedrock 클라이언트의 region_name도 us-east-2로 변경
+    # MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+    LATENCY_MODE = "standard"
+    # 프롬프트 캐싱은 지원 모델(Claude 3.7 Sonnet, 3.5 Haiku 등)에서만 켤 것 (미지원 모델은 cachePoint 요청을 거부)
+    PROMPT_CACHING = False
+    SYSTEM_PROMPT = "As an agent in charge of roaming-related work for the telecommunications company, you will be responsible for handling customers' roaming-related requests"
+    CACHE_POINT = {"cachePoint": {"type": "default"}}
+    # 같은 쿼리 안에서 인자가 같으면 결과를 재사용해도 되는 조회용 도구
+    CACHEABLE_TOOLS = {"list_roaming_plans", "get_roaming_usage"}
     
     def __init__(self):
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
-        self.bedrock = boto3.client(service_name='bedrock-runtime', region_name='us-west-2')
+        # 연결 풀을 넉넉히 두고 keep-alive로 연결을 재사용, 스로틀링(429)은 adaptive 재시도로 처리
+        bedrock_config = Config(
+            max_pool_connections=32,
+            retries={"mode": "adaptive", "total_max_attempts": 5},
+            connect_timeout=3,
+            read_timeout=60,
+            tcp_keepalive=True
+        )
+        self.bedrock = boto3.client(service_name='bedrock-runtime', region_name='us-west-2', config=bedrock_config)
         self.timing_stats = {}
+        # 서버의 도구 목록은 프로세스 동안 고정이므로 연결 시 한 번만 조회해 변환
+        self._tool_list_response = None
+        self._bedrock_tools: List[Dict] = []
+        # 스트림에서 toolUse 블록이 완성되는 즉시 시작한 도구 호출 (toolUseId -> Task)
+        self._pending_tool_calls: Dict[str, asyncio.Task] = {}
+        # 쿼리 내 조회용 도구 호출 결과 ((도구 이름, 인자) -> Task)
+        self._call_cache: Dict[tuple, asyncio.Task] = {}
 
     # connect_to_server는 메시지 전달을 위해 표준 입출력을 사용
     async def connect_to_server(self, server_script_path: str):
-        start_time = time.time()
+        start_time = time.perf_counter_ns()
         
         if not server_script_path.endswith(('.py', '.js')):
             raise ValueError("Server script must be a .py or .js file")
 
         command = "python" if server_script_path.endswith('.py') else "node"
-        server_params = StdioServerParameters(command=command, args=[server_script_path], env=None)
+        # 서버에는 기본 환경 변수만 전달되므로 측정 설정은 명시적으로 넘김
+        env = {**get_default_environment(), "MCP_TIMING": "1"} if TIMING else None
+        server_params = StdioServerParameters(command=command, args=[server_script_path], env=env)
 
         # exit_stack은 client session의 lifetime을 관리하는데 사용됩니다.
         stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
@@ -97,104 +125,187 @@ class MCPClient:
         self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
         await self.session.initialize()
 
-        response = await self.session.list_tools()
+        response = await self.refresh_tools()
         print("\nConnected to server with tools:", [tool.name for tool in response.tools])
         
-        end_time = time.time()
-        self.timing_stats["server_connection"] = end_time - start_time
-        print(f"서버 연결 시간: {self.timing_stats['server_connection']:.3f}초")
+        self.timing_stats["server_connection"] = time.perf_counter_ns() - start_time
+        if TIMING:
+            logger.debug(f"서버 연결 시간: {self.timing_stats['server_connection'] / 1e9:.3f}초")
+
+    # 서버의 도구 목록을 다시 조회해 Bedrock 형식으로 캐시
+    async def refresh_tools(self):
+        response = await self.session.list_tools()
+        available_tools = [{
+            "name": tool.name,
+            "description": tool.description,
+            "input_schema": tool.inputSchema
+        } for tool in response.tools]
+
+        self._tool_list_response = response
+        self._bedrock_tools = Message.to_bedrock_format(available_tools)
+        return response
 
     async def cleanup(self):
         await self.exit_stack.aclose()
 
     # client.py
-    def _make_bedrock_request(self, messages: List[Dict], tools: List[Dict]) -> Dict:
-        start_time = time.time()
+    async def _make_bedrock_request(self, messages: List[Dict], tools: List[Dict],
+                                    text_queue: Optional[asyncio.Queue] = None) -> Dict:
+        # boto3 호출은 블로킹이므로 별도 스레드에서 실행해 이벤트 루프를 막지 않음
+        # text_queue가 주어지면 생성되는 텍스트를 도착하는 대로 넣어줌
+        loop = asyncio.get_running_loop()
+        return await asyncio.to_thread(self._converse_stream, messages, tools, loop, text_queue)
+
+    def _converse_stream(self, messages: List[Dict], tools: List[Dict], loop: asyncio.AbstractEventLoop,
+                         text_queue: Optional[asyncio.Queue] = None) -> Dict:
+        start_time = time.perf_counter_ns()
+        first_byte_time = None
+
+        # 시스템 프롬프트와 도구 목록은 쿼리 동안 변하지 않으므로 캐시 지점을 둠
+        system = [{"text": self.SYSTEM_PROMPT}]
+        if self.PROMPT_CACHING:
+            system.append(self.CACHE_POINT)
+            tools = tools + [self.CACHE_POINT]
         
-        response = self.bedrock.converse(
+        response = self.bedrock.converse_stream(
             modelId=self.MODEL_ID,
-            system=[{"text":"As an agent in charge of roaming-related work for the telecommunications company, you will be responsible for handling customers' roaming-related requests"}],
+            system=system,
             messages=messages,
             inferenceConfig={"maxTokens": 2048, "temperature": 0, "topP": 1},
-            toolConfig={"tools": tools}
+            toolConfig={"tools": tools},
+            performanceConfig={"latency": self.LATENCY_MODE}
         )
+
+        # 스트림 이벤트를 converse 응답과 같은 형태로 조립
+        blocks = {}
+        stop_reason = None
+        for event in response["stream"]:
+            if first_byte_time is None:
+                first_byte_time = time.perf_counter_ns()
+
+            if "contentBlockStart" in event:
+                start = event["contentBlockStart"]["start"]
+                if "toolUse" in start:
+                    blocks[event["contentBlockStart"]["contentBlockIndex"]] = {
+                        "toolUse": {
+                            "toolUseId": start["toolUse"]["toolUseId"],
+                            "name": start["toolUse"]["name"],
+                            "input": ""
+                        }
+                    }
+            elif "contentBlockDelta" in event:
+                index = event["contentBlockDelta"]["contentBlockIndex"]
+                delta = event["contentBlockDelta"]["delta"]
+                if "text" in delta:
+                    block = blocks.setdefault(index, {"text": ""})
+                    block["text"] += delta["text"]
+                    if text_queue is not None:
+                        loop.call_soon_threadsafe(text_queue.put_nowait, delta["text"])
+                elif "toolUse" in delta:
+                    blocks[index]["toolUse"]["input"] += delta["toolUse"]["input"]
+            elif "contentBlockStop" in event:
+                block = blocks.get(event["contentBlockStop"]["contentBlockIndex"])
+                if block is not None and "toolUse" in block:
+                    # (tool) 블록이 완성되면 messageStop을 기다리지 않고 바로 도구 호출 시작
+                    # maxTokens로 블록이 잘리면 입력 JSON이 불완전하므로 미리 호출하지 않음
+                    try:
+                        block["toolUse"]["input"] = orjson.loads(block["toolUse"]["input"] or "{}")
+                    except orjson.JSONDecodeError:
+                        continue
+                    loop.call_soon_threadsafe(self._dispatch_tool_call, block["toolUse"])
+            elif "messageStop" in event:
+                stop_reason = event["messageStop"]["stopReason"]
         
-        end_time = time.time()
+        end_time = time.perf_counter_ns()
         request_time = end_time - start_time
+        first_byte = (first_byte_time or end_time) - start_time
         
         # 타이밍 통계 업데이트
         if "bedrock_requests" not in self.timing_stats:
             self.timing_stats["bedrock_requests"] = []
+        if "bedrock_first_bytes" not in self.timing_stats:
+            self.timing_stats["bedrock_first_bytes"] = []
         
         self.timing_stats["bedrock_requests"].append(request_time)
-        print(f"Bedrock 요청 시간: {request_time:.3f}초")
+        self.timing_stats["bedrock_first_bytes"].append(first_byte)
         
-        return response
+        return {
+            "output": {
+                "message": {
+                    "role": "assistant",
+                    "content": [blocks[index] for index in sorted(blocks)]
+                }
+            },
+            "stopReason": stop_reason
+        }
 
-    async def process_query(self, query: str) -> str:
-        total_start_time = time.time()
+    # 스트리밍 중 완성된 toolUse 블록의 도구 호출을 미리 시작
+    # 조회용 도구만 미리 호출하고, 상태를 바꾸는 도구(가입 등)는 stopReason이 tool_use로 확정된 뒤 호출
+    def _dispatch_tool_call(self, tool_info: Dict):
+        if tool_info['name'] not in self.CACHEABLE_TOOLS:
+            return
+        self._pending_tool_calls[tool_info['toolUseId']] = self._start_tool_call(tool_info['name'], tool_info['input'])
+
+    # 도구 호출 시작, 조회용 도구는 같은 인자의 이전 호출을 재사용
+    def _start_tool_call(self, tool_name: str, tool_args: Dict) -> asyncio.Task:
+        if tool_name not in self.CACHEABLE_TOOLS:
+            # 상태를 바꾸는 도구 호출 뒤에는 이전 조회 결과를 재사용하지 않음
+            self._call_cache.clear()
+            return asyncio.ensure_future(self.session.call_tool(tool_name, tool_args))
+
+        key = (tool_name, orjson.dumps(tool_args, option=orjson.OPT_SORT_KEYS))
+        call = self._call_cache.get(key)
+        if call is None:
+            call = self._call_cache[key] = asyncio.ensure_future(self.session.call_tool(tool_name, tool_args))
+        return call
+
+    async def process_query(self, query: str) -> AsyncIterator[str]:
+        total_start_time = time.perf_counter_ns()
         
         # 타이밍 통계 초기화
         self.timing_stats = {
             "query_start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "bedrock_requests": [],
+            "bedrock_first_bytes": [],
             "tool_calls": []
         }
-        
-        print(f"\n쿼리 실행 시작: {self.timing_stats['query_start_time']}")
+        self._pending_tool_calls = {}
+        self._call_cache = {}
         
         # (1) 메시지 준비
-        messages = [Message.user(query).__dict__]
+        messages = [Message.user(query)]
+        self._mark_cache_point(messages)
         
-        # (2) 도구 목록 가져오기
-        tool_list_start = time.time()
-        response = await self.session.list_tools()
-        tool_list_end = time.time()
-        self.timing_stats["tool_listing"] = tool_list_end - tool_list_start
-        print(f"도구 목록 조회 시간: {self.timing_stats['tool_listing']:.3f}초")
-
-        # (3) 도구 변환
-        tool_convert_start = time.time()
-        available_tools = [{
-            "name": tool.name,
-            "description": tool.description,
-            "input_schema": tool.inputSchema
-        } for tool in response.tools]
-
-        bedrock_tools = Message.to_bedrock_format(available_tools)
-        tool_convert_end = time.time()
-        self.timing_stats["tool_conversion"] = tool_convert_end - tool_convert_start
-        print(f"도구 변환 시간: {self.timing_stats['tool_conversion']:.3f}초")
-
-        # (4) 첫 요청
-        response = self._make_bedrock_request(messages, bedrock_tools)
-
-        # (6) 응답 처리
-        result = await self._process_response(
-          response, messages, bedrock_tools
-        )
+        # (2) 도구 목록은 connect_to_server에서 캐시됨
+        bedrock_tools = self._bedrock_tools
+        self.timing_stats["tool_listing"] = 0.0
+        self.timing_stats["tool_conversion"] = 0.0
+
+        # (3) 응답 처리 (텍스트와 도구 호출 알림을 생성되는 대로 전달)
+        async for chunk in self._process_response(messages, bedrock_tools):
+            yield chunk
         
-        total_end_time = time.time()
-        self.timing_stats["total_execution_time"] = total_end_time - total_start_time
+        self.timing_stats["total_execution_time"] = time.perf_counter_ns() - total_start_time
         
-        # 타이밍 요약 추가
-        timing_summary = self._get_timing_summary()
-        
-        return result + "\n\n" + timing_summary
+        # 단계별 측정 결과는 요약 하나로 모아서 출력
+        if TIMING:
+            logger.debug(self._get_timing_summary())
 
-    # 타이밍 요약 생성
+    # 타이밍 요약 생성 (측정값은 나노초 단위로 보관)
     def _get_timing_summary(self) -> str:
-        bedrock_total = sum(self.timing_stats["bedrock_requests"])
+        bedrock_total = sum(self.timing_stats["bedrock_requests"]) / 1e9
         bedrock_avg = bedrock_total / len(self.timing_stats["bedrock_requests"]) if self.timing_stats["bedrock_requests"] else 0
+        first_byte_avg = sum(self.timing_stats["bedrock_first_bytes"]) / 1e9 / len(self.timing_stats["bedrock_first_bytes"]) if self.timing_stats["bedrock_first_bytes"] else 0
         
-        tool_calls_total = sum(call["total"] for call in self.timing_stats["tool_calls"]) if self.timing_stats["tool_calls"] else 0
+        tool_calls_total = sum(call["total"] for call in self.timing_stats["tool_calls"]) / 1e9 if self.timing_stats["tool_calls"] else 0
         tool_calls_avg = tool_calls_total / len(self.timing_stats["tool_calls"]) if self.timing_stats["tool_calls"] else 0
         
         summary = f"\n[실행 시간 측정 결과]"
         summary += f"\n• 쿼리 입력 시간: {self.timing_stats['query_start_time']}"
-        summary += f"\n• 총 실행 시간: {self.timing_stats['total_execution_time']:.3f}초"
+        summary += f"\n• 총 실행 시간: {self.timing_stats['total_execution_time'] / 1e9:.3f}초"
         summary += f"\n• Bedrock API 호출 횟수: {len(self.timing_stats['bedrock_requests'])}회"
         summary += f"\n• Bedrock API 총 시간: {bedrock_total:.3f}초 (평균: {bedrock_avg:.3f}초)"
+        summary += f"\n• Bedrock 첫 응답 평균 시간: {first_byte_avg:.3f}초"
         summary += f"\n• 도구 호출 횟수: {len(self.timing_stats['tool_calls'])}회"
         summary += f"\n• 도구 호출 총 시간: {tool_calls_total:.3f}초 (평균: {tool_calls_avg:.3f}초)"
         
@@ -202,86 +313,98 @@ class MCPClient:
         if self.timing_stats["tool_calls"]:
             summary += "\n\n[도구별 호출 시간]"
             for i, call in enumerate(self.timing_stats["tool_calls"], 1):
-                summary += f"\n{i}. {call['name']} → {call['total']:.3f}초"
+                summary += f"\n{i}. {call['name']} → {call['total'] / 1e9:.3f}초"
         
         return summary
 
+    # 대화의 마지막 메시지에 캐시 지점을 두어 다음 요청이 이전 대화 전체를 캐시에서 읽도록 함
+    # 요청당 캐시 지점은 최대 4개이므로 (시스템, 도구 포함) 메시지에는 직전 것과 새 것만 유지
+    def _mark_cache_point(self, messages: List[Dict]):
+        if not self.PROMPT_CACHING:
+            return
+        marked = [message for message in messages if self.CACHE_POINT in message['content']]
+        for message in marked[:-1]:
+            message['content'].remove(self.CACHE_POINT)
+        messages[-1]['content'].append(self.CACHE_POINT)
+
     # client.py
-    async def _process_response(self, response: Dict, messages: List[Dict], bedrock_tools: List[Dict]) -> str:
+    async def _process_response(self, messages: List[Dict], bedrock_tools: List[Dict]) -> AsyncIterator[str]:
         # (1)
-        final_text = []
         MAX_TURNS=10
         turn_count = 0
 
         while True:
-            # (2)
-            if response['stopReason'] == 'tool_use':
-                final_text.append("received toolUse request")
-                for item in response['output']['message']['content']:
-                    if 'text' in item:
-                        final_text.append(f"[Thinking: {item['text']}]")
-                        messages.append(Message.assistant(item['text']).__dict__)
-                    elif 'toolUse' in item:
-                        # (3)
-                        tool_info = item['toolUse']
-                        result = await self._handle_tool_call(tool_info, messages)
-                        final_text.extend(result)
-                        
-                        response = self._make_bedrock_request(messages, bedrock_tools)
-            # (4)
-            elif response['stopReason'] == 'max_tokens':
-                final_text.append("[Max tokens reached, ending conversation.]")
-                break
-            elif response['stopReason'] == 'stop_sequence':
-                final_text.append("[Stop sequence reached, ending conversation.]")
-                break
-            elif response['stopReason'] == 'content_filtered':
-                final_text.append("[Content filtered, ending conversation.]")
-                break
-            elif response['stopReason'] == 'end_turn':
-                final_text.append(response['output']['message']['content'][0]['text'])
+            # (2) Bedrock 요청, 생성되는 텍스트는 도착하는 대로 전달
+            text_queue = asyncio.Queue()
+            request = asyncio.ensure_future(self._make_bedrock_request(messages, bedrock_tools, text_queue))
+            request.add_done_callback(lambda _: text_queue.put_nowait(None))
+
+            separate = turn_count > 0
+            while (text := await text_queue.get()) is not None:
+                if separate:
+                    yield "\n\n"
+                    separate = False
+                yield text
+            response = await request
+
+            # (3)
+            stop_reason = response['stopReason']
+            if stop_reason == 'tool_use':
+                # user/assistant 메시지가 번갈아 오도록 assistant 응답은 블록 그대로 한 번에 추가
+                content = response['output']['message']['content']
+                messages.append({"role": "assistant", "content": content})
+                tool_uses = [item['toolUse'] for item in content if 'toolUse' in item]
+
+                # (4) 같은 턴의 도구 호출은 서로 독립적이므로 동시에 실행
+                for tool_info in tool_uses:
+                    yield f"\n\n[Calling tool {tool_info['name']} with args {tool_info['input']}]"
+                results = await asyncio.gather(*[self._handle_tool_call(tool_info) for tool_info in tool_uses])
+                messages.append(Message.tool_results([
+                    (tool_info['toolUseId'], result.content) for tool_info, result in zip(tool_uses, results)
+                ]))
+                self._mark_cache_point(messages)
+            # (5) 그 외 종료 사유는 안내 문구만 전달하고 종료
+            else:
+                # 미리 시작했지만 결과를 쓰지 않을 도구 호출은 취소
+                for pending in self._pending_tool_calls.values():
+                    pending.cancel()
+                self._pending_tool_calls.clear()
+                stop_message = _STOP_MESSAGES.get(stop_reason)
+                if stop_message:
+                    yield f"\n\n{stop_message}"
                 break
 
             turn_count += 1
 
             if turn_count >= MAX_TURNS:
-                final_text.append("\n[Max turns reached, ending conversation.]")
+                yield "\n\n[Max turns reached, ending conversation.]"
                 break
-        # (5)
-        return "\n\n".join(final_text)
 
     # client.py
-    async def _handle_tool_call(self, tool_info: Dict, messages: List[Dict]) -> List[str]:
+    async def _handle_tool_call(self, tool_info: Dict) -> Any:
         # 도구 호출 시간 측정 시작
-        start_time = time.time()
+        start_time = time.perf_counter_ns()
         
         # (1)
         tool_name = tool_info['name']
         tool_args = tool_info['input']
         tool_use_id = tool_info['toolUseId']
 
-        # (2)
-        result = await self.session.call_tool(tool_name, tool_args)
-
-        # (3)
-        messages.append(Message.tool_request(tool_use_id, tool_name, tool_args).__dict__)
-        messages.append(Message.tool_result(tool_use_id, result.content).__dict__)
-
-        # 도구 호출 시간 측정 종료
-        end_time = time.time()
-        execution_time = end_time - start_time
-        
-        # 타이밍 통계에 추가
-        self.timing_stats["tool_calls"].append({
-            "name": tool_name,
-            "args": tool_args,
-            "total": execution_time
-        })
-        
-        print(f"도구 호출 {tool_name} 실행 시간: {execution_time:.3f}초")
+        # (2) 스트리밍 중 이미 시작된 호출이 있으면 그 결과를 사용
+        pending = self._pending_tool_calls.pop(tool_use_id, None)
+        if pending is None:
+            pending = self._start_tool_call(tool_name, tool_args)
+        result = await pending
+
+        # 도구 호출 시간 측정 종료 후 타이밍 통계에 추가
+        if TIMING:
+            self.timing_stats["tool_calls"].append({
+                "name": tool_name,
+                "total": time.perf_counter_ns() - start_time
+            })
         
-        # (4)
-        return [f"[Calling tool {tool_name} with args {tool_args}]"]
+        # (3)
+        return result
 
     # client.py
     async def chat_loop(self):
@@ -292,17 +415,18 @@ class MCPClient:
                 if query.lower() == 'quit':
                     break
                 
-                query_start_time = time.time()
-                print(f"쿼리 처리 시작: {datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}")
-                
-                response = await self.process_query(query)
+                query_start_time = time.perf_counter_ns()
                 
-                query_end_time = time.time()
-                query_total_time = query_end_time - query_start_time
-                print(f"\n응답 완료: {datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}")
-                print(f"총 처리 시간: {query_total_time:.3f}초")
+                # 응답은 생성되는 대로 출력
+                sys.stdout.write("\n")
+                async for chunk in self.process_query(query):
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
+                sys.stdout.write("\n")
+                sys.stdout.flush()
                 
-                print("\n" + response)
+                if TIMING:
+                    logger.debug(f"총 처리 시간: {(time.perf_counter_ns() - query_start_time) / 1e9:.3f}초")
             except Exception as e:
                 print(f"\nError: {str(e)}")
 
@@ -312,6 +436,10 @@ async def main():
         print("Usage: python client.py <path_to_server_script>")
         sys.exit(1)
 
+    logging.basicConfig(format="%(message)s")
+    if TIMING:
+        logger.setLevel(logging.DEBUG)
+
     client = MCPClient()
     try:
         await client.connect_to_server(sys.argv[1])
@@ -1,22 +1,53 @@
 from typing import Any, Dict, List, Optional
-import requests
+import httpx
+import orjson
 from datetime import datetime
 import time
 import functools
+import logging
+import os
+from contextvars import ContextVar
+import heapq
 from mcp.server.fastmcp import FastMCP
 
-# 실행 시간 측정 데코레이터
+# MCP_TIMING=1 일 때만 실행 시간을 측정해 출력 (stdout은 stdio 전송에 쓰이므로 stderr 로그 사용)
+TIMING = os.getenv("MCP_TIMING") == "1"
+logger = logging.getLogger(__name__)
+if TIMING:
+    logger.setLevel(logging.DEBUG)
+
+# 도구 실행 한 번 동안의 단계별 실행 시간 (단계 이름 -> 초)
+_timing_steps: ContextVar[Optional[Dict[str, float]]] = ContextVar("_timing_steps", default=None)
+
+def _record_step(name: str, start_time: int):
+    """측정 중인 도구 실행에 단계별 실행 시간 기록"""
+    steps = _timing_steps.get()
+    if steps is not None:
+        steps[name] = (time.perf_counter_ns() - start_time) / 1e9
+
+# 실행 시간 측정 데코레이터 (측정하지 않을 때는 원래 함수를 그대로 사용)
 def measure_execution_time(func):
+    if not TIMING:
+        return func
+
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
-        start_time = time.time()
+        steps: Dict[str, float] = {}
+        token = _timing_steps.set(steps)
+        start_time = time.perf_counter_ns()
         try:
-            result = await func(*args, **kwargs)
-            return result
+            return await func(*args, **kwargs)
         finally:
-            end_time = time.time()
-            execution_time = end_time - start_time
-            print(f"[성능측정] {func.__name__} 실행 시간: {execution_time:.3f}초")
+            execution_time = (time.perf_counter_ns() - start_time) / 1e9
+            _timing_steps.reset(token)
+            # 도구 실행 한 번당 로그 레코드 하나로 기록
+            logger.debug(
+                "[성능측정] %s 실행 시간: %.3f초 (%s)",
+                func.__name__,
+                execution_time,
+                ", ".join(f"{name}: {seconds:.3f}초" for name, seconds in steps.items()),
+                extra={"timing": {"tool": func.__name__, "total": execution_time, "steps": steps}},
+            )
     return wrapper
 
 # Initialize FastMCP server
@@ -25,6 +56,44 @@ mcp = FastMCP("roaming")
 # API 기본 URL 설정
 API_BASE_URL = "https://eippdmnpvr.us-west-2.awsapprunner.com"
 
+# 모든 도구가 공유하는 HTTP 클라이언트 (keep-alive로 TCP/TLS 연결 재사용)
+_http = httpx.AsyncClient(
+    base_url=API_BASE_URL,
+    limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+    timeout=httpx.Timeout(30.0),
+)
+
+# 요금제 목록 캐시 (자주 바뀌지 않으므로 TTL 동안 API 호출 생략)
+PLANS_CACHE_TTL = 300
+_plans_cache = {"by_country": None, "expires_at": 0.0}
+
+def _plan_duration_hours(plan: Dict[str, Any]) -> int:
+    """요금제 이용기간을 시간 단위로 환산"""
+    return plan['duration'] if plan['duration_unit'] == 'hours' else plan['duration'] * 24
+
+async def _get_plans_by_country() -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """국가별로 색인된 요금제 목록 조회 (캐시 만료 시에만 API 호출)"""
+    if _plans_cache["by_country"] is not None and time.monotonic() < _plans_cache["expires_at"]:
+        return _plans_cache["by_country"]
+
+    api_start_time = time.perf_counter_ns()
+    response = await _http.get("/roaming/plans")
+    _record_step("요금제 목록 API 호출", api_start_time)
+
+    if response.status_code != 200:
+        return None
+
+    by_country: Dict[str, List[Dict[str, Any]]] = {}
+    for plan in orjson.loads(response.content):
+        # 이용기간을 시간 단위로 한 번만 환산해 둠
+        plan['_duration_hours'] = _plan_duration_hours(plan)
+        for country in plan['supported_countries']:
+            by_country.setdefault(country, []).append(plan)
+
+    _plans_cache["by_country"] = by_country
+    _plans_cache["expires_at"] = time.monotonic() + PLANS_CACHE_TTL
+    return by_country
+
 @mcp.tool()
 @measure_execution_time
 async def list_roaming_plans(country: str, duration: int) -> str:
@@ -39,40 +108,29 @@ async def list_roaming_plans(country: str, duration: int) -> str:
         if duration <= 0:
             return "여행 기간은 1일 이상이어야 합니다."
             
-        # API에서 요금제 목록 조회
-        api_start_time = time.time()
-        response = requests.get(f"{API_BASE_URL}/roaming/plans")
-        api_end_time = time.time()
-        print(f"[성능측정] 요금제 목록 API 호출 시간: {api_end_time - api_start_time:.3f}초")
+        # 요금제 목록 조회 (캐시 사용)
+        plans_by_country = await _get_plans_by_country()
         
-        if response.status_code != 200:
+        if plans_by_country is None:
             return "요금제 정보 조회 실패"
         
-        plans = response.json()
-        
         # 국가 지원 여부 확인 및 필터링
-        filter_start_time = time.time()
-        available_plans = [
-            plan for plan in plans 
-            if country in plan['supported_countries']
-        ]
-        filter_end_time = time.time()
-        print(f"[성능측정] 요금제 필터링 시간: {filter_end_time - filter_start_time:.3f}초")
+        filter_start_time = time.perf_counter_ns()
+        available_plans = plans_by_country.get(country, [])
+        _record_step("요금제 필터링", filter_start_time)
         
         if not available_plans:
             return f"죄송합니다. {country}는 현재 서비스가 지원되지 않는 국가입니다."
         
         # 최적 요금제 선택
-        select_start_time = time.time()
+        select_start_time = time.perf_counter_ns()
         recommended_plans = select_best_plan(available_plans, duration)
-        select_end_time = time.time()
-        print(f"[성능측정] 최적 요금제 선택 시간: {select_end_time - select_start_time:.3f}초")
+        _record_step("최적 요금제 선택", select_start_time)
         
         # 응답 메시지 생성
-        format_start_time = time.time()
+        format_start_time = time.perf_counter_ns()
         message = format_recommendation_message(recommended_plans, country, duration)
-        format_end_time = time.time()
-        print(f"[성능측정] 응답 메시지 생성 시간: {format_end_time - format_start_time:.3f}초")
+        _record_step("응답 메시지 생성", format_start_time)
         
         return message
         
@@ -88,37 +146,38 @@ async def get_roaming_usage(phone_number: str) -> str:
         phone_number: 고객 전화번호
     """
     try:
-        api_start_time = time.time()
-        response = requests.get(f"{API_BASE_URL}/roaming/subscription/{phone_number}")
-        api_end_time = time.time()
-        print(f"[성능측정] 이용내역 API 호출 시간: {api_end_time - api_start_time:.3f}초")
+        api_start_time = time.perf_counter_ns()
+        response = await _http.get(f"/roaming/subscription/{phone_number}")
+        _record_step("이용내역 API 호출", api_start_time)
         
         if response.status_code != 200:
             return "이용내역 조회 중 오류가 발생했습니다."
         
-        usages = response.json()  # 배열 형태로 응답 받음
+        usages = orjson.loads(response.content)  # 배열 형태로 응답 받음
         
         if not usages:  # 이용내역이 없는 경우
             return f"로밍 이용내역이 없습니다. (전화번호: {phone_number})"
         
         # 모든 이용내역을 포맷팅하여 표시
-        format_start_time = time.time()
-        message = f"\n로밍 이용내역 (전화번호: {phone_number})"
+        format_start_time = time.perf_counter_ns()
+        parts = [f"\n로밍 이용내역 (전화번호: {phone_number})"]
         
         for usage in usages:
-            subscription_date = datetime.fromisoformat(usage['subscription_date'].replace('Z', '+00:00'))
-            start_date = datetime.fromisoformat(usage['start_date'].replace('Z', '+00:00'))
-            end_date = datetime.fromisoformat(usage['end_date'].replace('Z', '+00:00'))
+            # ISO 8601 문자열(YYYY-MM-DDTHH:MM:SS...)에서 필요한 부분만 잘라 사용
+            subscription_date = usage['subscription_date'][:16].replace('T', ' ')
+            start_date = usage['start_date'][:10]
+            end_date = usage['end_date'][:10]
             
-            message += f"""
+            parts.append(f"""
 \n[{usage['plan_name']}]
 • 이용 국가: {usage['roaming_country']}
-• 가입일시: {subscription_date.strftime('%Y-%m-%d %H:%M')}
-• 시작일시: {start_date.strftime('%Y-%m-%d')} {usage['start_time']} ({usage['time_standard']})
-• 종료일시: {end_date.strftime('%Y-%m-%d')}"""
+• 가입일시: {subscription_date}
+• 시작일시: {start_date} {usage['start_time']} ({usage['time_standard']})
+• 종료일시: {end_date}""")
+        
+        message = "".join(parts)
         
-        format_end_time = time.time()
-        print(f"[성능측정] 이용내역 포맷팅 시간: {format_end_time - format_start_time:.3f}초")
+        _record_step("이용내역 포맷팅", format_start_time)
         
         return message
 
@@ -150,20 +209,20 @@ async def subscribe_roaming_plan(phone_number: str, plan_code: str, roaming_coun
         }
         
         # API 호출
-        api_start_time = time.time()
-        response = requests.post(
-            f"{API_BASE_URL}/roaming/subscribe",
-            json=request_data
+        api_start_time = time.perf_counter_ns()
+        response = await _http.post(
+            "/roaming/subscribe",
+            content=orjson.dumps(request_data),
+            headers={"Content-Type": "application/json"}
         )
-        api_end_time = time.time()
-        print(f"[성능측정] 요금제 가입 API 호출 시간: {api_end_time - api_start_time:.3f}초")
+        _record_step("요금제 가입 API 호출", api_start_time)
         
         if response.status_code != 200:
             return "요금제 가입 중 오류가 발생했습니다."
             
-        subscription_data = response.json()
+        subscription_data = orjson.loads(response.content)
         
-        format_start_time = time.time()
+        format_start_time = time.perf_counter_ns()
         result = f"""
 로밍 요금제 가입이 완료되었습니다.
 
@@ -173,8 +232,7 @@ async def subscribe_roaming_plan(phone_number: str, plan_code: str, roaming_coun
 • 이용 국가: {roaming_country}
 • 시작일: {start_date.split('T')[0]} {start_time}
 """
-        format_end_time = time.time()
-        print(f"[성능측정] 응답 포맷팅 시간: {format_end_time - format_start_time:.3f}초")
+        _record_step("응답 포맷팅", format_start_time)
         
         return result
         
@@ -189,31 +247,30 @@ def select_best_plan(plans: List[Dict[str, Any]], duration: int) -> List[Dict[st
 
     duration_hours = duration * 24
 
+    priced_plans = []
     for plan in plans:
-        plan_duration_hours = (
-            plan['duration'] * 24 if plan['duration_unit'] == 'days'
-            else plan['duration'] if plan['duration_unit'] == 'hours'
-            else plan['duration'] * 24
-        )
-        
+        # 캐시에서 온 요금제는 환산된 이용기간을 그대로 사용
+        plan_duration_hours = plan.get('_duration_hours') or _plan_duration_hours(plan)
         purchases_needed = -(-duration_hours // plan_duration_hours)
-        total_price = plan['price'] * purchases_needed
-        
-        plan['total_price'] = total_price
-        plan['purchases_needed'] = purchases_needed
+        priced_plans.append((plan['price'] * purchases_needed, purchases_needed, plan))
 
-    return sorted(plans, key=lambda x: x['total_price'])[:5]
+    # 캐시된 요금제를 변경하지 않도록 선택된 5개만 복사해 계산 결과를 담음
+    best_plans = heapq.nsmallest(5, priced_plans, key=lambda x: x[0])
+    return [
+        {**plan, 'total_price': total_price, 'purchases_needed': purchases_needed}
+        for total_price, purchases_needed, plan in best_plans
+    ]
 
 def format_recommendation_message(plans: List[Dict[str, Any]], country: str, duration: int) -> str:
     """추천 요금제 응답 메시지 포맷팅"""
     if not plans:
         return f"{country}에 대한 적합한 요금제를 찾을 수 없습니다."
         
-    details = f"\n{country} 여행 {duration}일을 위한 추천 요금제 TOP 5입니다:\n"
+    details = [f"\n{country} 여행 {duration}일을 위한 추천 요금제 TOP 5입니다:\n"]
     
     for i, plan in enumerate(plans, 1):
         duration_unit_text = "일" if plan['duration_unit'] == 'days' else "시간"
-        details += f"""
+        details.append(f"""
 {i}. [{plan['plan_name']}]
 • 이용기간: {plan['duration']}{duration_unit_text}
 • 데이터: {plan['data_amount']}
@@ -222,7 +279,7 @@ def format_recommendation_message(plans: List[Dict[str, Any]], country: str, dur
 • 1회 이용료: {plan['price']:,}원
 • {duration}일 총 요금: {plan['total_price']:,}원 ({plan['purchases_needed']}회 이용)
 • 요금제 코드: {plan['plan_code']}
-"""
+""")
     
     best_plan = plans[0]
     duration_unit_text = "일" if best_plan['duration_unit'] == 'days' else "시간"
@@ -243,9 +300,9 @@ def format_recommendation_message(plans: List[Dict[str, Any]], country: str, dur
         else:
             voice_info += f"발신은 분당 {best_plan['voice_outgoing_fee']}원입니다."
     
-    return f"{summary}{voice_info}\n\n{details}"
+    return f"{summary}{voice_info}\n\n{''.join(details)}"
 
 if __name__ == "__main__":
-    print("[성능측정] MCP 서버 시작 시간:", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    logger.debug("[성능측정] MCP 서버 시작 시간: %s", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     # Initialize and run the server
     mcp.run(transport='stdio') 
\ No newline at end of file